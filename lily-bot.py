@@ -1,11 +1,16 @@
+import aiohttp
 import discord
 from discord.ext import commands
 import logging
+from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 import os
 import asyncio
-import googleapiclient.discovery
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
 import re
+import time
 import webserver
 
 # Load environment variables
@@ -14,143 +19,300 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
 
 # Setup logging
-handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
+# Rotate at 10 MB so long-running sessions can't grow the log without bound
+handler = RotatingFileHandler(filename='discord.log', encoding='utf-8', maxBytes=10_000_000, backupCount=3)
 
 # Bot permissions
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class LilyBot(commands.Bot):
+    """Bot that owns the YouTube API HTTP session for its whole lifetime"""
+    
+    async def setup_hook(self):
+        global youtube_http
+        # Initialize YouTube API client
+        if YOUTUBE_API_KEY:
+            youtube_http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60)
+            )
+            print("YouTube API client initialized")
+        else:
+            print("Warning: YouTube API key not found!")
+    
+    async def close(self):
+        if youtube_http is not None:
+            await youtube_http.close()
+        await super().close()
 
-# Global variables
-active_streams = {}  # Dictionary to track active streams per channel
-youtube_client = None
+bot = LilyBot(command_prefix="!", intents=intents)
 
 # SongQueue
-song_list = {}
-current_idx = 0
-played_idx = 0
+@dataclass
+class QueueState:
+    """Song queue and live chat monitoring state for one Discord channel"""
+    titles: list = field(default_factory=list)
+    requesters: list = field(default_factory=list)
+    played_idx: int = -1  # 0-based; -1 means nothing played yet
+    video_id: str = ''  # Video being monitored, empty when idle
+    use_embeds: bool = False  # Relay !req messages as embeds instead of plain text (!req_embed)
+    fetch_task: Optional[asyncio.Task] = None  # Running fetch_live_chat_messages task, None when idle
+
+# Global variables
+streams = {}  # Dictionary of QueueState per Discord channel id
+youtube_http = None  # Shared aiohttp session for YouTube Data API calls
+chat_id_cache = {}  # video_id -> (live_chat_id, fetched_at) to skip repeat videos().list calls
+CHAT_ID_CACHE_TTL = 3600  # seconds
+
+# Matches watch?v=, live/, embed/ and youtu.be/ URL formats
+_YT_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?v=|live/|embed/)|youtu\.be/)([a-zA-Z0-9_-]{11})')
+
+# Chat command prefix for song requests (matched case-insensitively)
+_REQ_PREFIX = '!req'
+_REQ_PREFIX_LEN = len(_REQ_PREFIX)
+
+# Shared embed styling for request messages
+_YT_COLOR = discord.Color.red()
+_YT_FOOTER = "YouTube Live Chat"
+_TRAKTEER_FOOTER = "Trakteer Request Chat"
+
+# Discord's limits on embeds and characters in a single message
+_MAX_EMBEDS_PER_MESSAGE = 10
+_MAX_MESSAGE_LENGTH = 2000
+
+# Plain-text relays must never ping anyone mentioned in chat
+_NO_MENTIONS = discord.AllowedMentions.none()
+
+# YouTube Data API v3 endpoints
+_YT_API_URL = "https://www.googleapis.com/youtube/v3"
+_YT_VIDEOS_URL = f"{_YT_API_URL}/videos"
+_YT_CHAT_MESSAGES_URL = f"{_YT_API_URL}/liveChat/messages"
+
+# Partial response: only request the fields we actually read from each poll
+_CHAT_FIELDS = "nextPageToken,pollingIntervalMillis,items(id,snippet/displayMessage,authorDetails/displayName)"
+
+class YouTubeAPIError(Exception):
+    """Error response from the YouTube Data API, with its reason code"""
+
+async def youtube_get(url: str, params: dict) -> dict:
+    """GET a YouTube Data API endpoint and return the decoded JSON body"""
+    async with youtube_http.get(url, params=params) as resp:
+        try:
+            data = await resp.json(content_type=None)
+        except ValueError:
+            data = None
+        
+        if resp.status >= 400:
+            # Surface the API's reason (quotaExceeded, liveChatEnded, ...) rather
+            # than the bare status; the URL isn't included since it carries the key
+            error = data.get("error", {}) if isinstance(data, dict) else {}
+            reason = next((e.get("reason") for e in error.get("errors", []) if e.get("reason")), None)
+            message = error.get("message") or resp.reason
+            raise YouTubeAPIError(f"{resp.status} {reason or 'error'}: {message}")
+        
+        return data
+
+def get_queue(channel_id: int) -> QueueState:
+    """Get the queue state for a channel, creating it on first use"""
+    state = streams.get(channel_id)
+    if state is None:
+        state = streams[channel_id] = QueueState()
+    return state
+
+def chunk_lines(lines: list, limit: int = _MAX_MESSAGE_LENGTH):
+    """Join lines into as few messages as possible without exceeding limit"""
+    chunk, size = [], 0
+    for line in lines:
+        if chunk and size + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
 
 def extract_youtube_id(url: str) -> str:
     """Extract YouTube video ID from various URL formats"""
-    # Regular expression patterns for different YouTube URL formats
-    patterns = [
-        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})',
-        r'(?:https?://)?(?:www\.)?youtube\.com/live/([a-zA-Z0-9_-]{11})',
-        r'(?:https?://)?youtu\.be/([a-zA-Z0-9_-]{11})',
-        r'(?:https?://)?(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]{11})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    # Cheap substring check before touching the regex
+    if 'youtu' not in url:
+        return None
     
-    return None
+    match = _YT_ID_RE.search(url)
+    return match.group(1) if match else None
 
 async def get_live_chat_id(video_id: str) -> str:
     """Get the live chat ID for a YouTube video"""
+    cached = chat_id_cache.get(video_id)
+    if cached and time.monotonic() - cached[1] < CHAT_ID_CACHE_TTL:
+        return cached[0]
+    
     try:
-        response = youtube_client.videos().list(
-            part="liveStreamingDetails",
-            id=video_id
-        ).execute()
+        params = {"key": YOUTUBE_API_KEY, "part": "liveStreamingDetails", "id": video_id}
+        response = await youtube_get(_YT_VIDEOS_URL, params)
         
         if response["items"]:
             live_details = response["items"][0].get("liveStreamingDetails")
             if live_details and "activeLiveChatId" in live_details:
-                return live_details["activeLiveChatId"]
+                live_chat_id = live_details["activeLiveChatId"]
+                chat_id_cache[video_id] = (live_chat_id, time.monotonic())
+                return live_chat_id
         
+        chat_id_cache.pop(video_id, None)
         return None
     except Exception as e:
         print(f"Error getting live chat ID: {e}")
+        chat_id_cache.pop(video_id, None)
         return None
 
 async def fetch_live_chat_messages(video_id: str, discord_channel):
     """Fetch live chat messages and send them to Discord channel"""
-    global current_idx, song_list  # Fix: Add global declaration
+    state = get_queue(discord_channel.id)
+    
+    def _release():
+        # Free the channel unless a newer run has already taken it over
+        if state.fetch_task is asyncio.current_task():
+            state.fetch_task = None
+            state.video_id = ''
     
     live_chat_id = await get_live_chat_id(video_id)
     
     if not live_chat_id:
+        _release()
         await discord_channel.send("❌ This video doesn't have an active live chat or isn't currently live.")
         return
     
     await discord_channel.send(f"✅ Started monitoring live chat for video: `{video_id}`")
     
     next_page_token = None
-    processed_messages = set()  # To avoid duplicate messages
+    # nextPageToken already gives us only new messages; keep a small ring
+    # of recent IDs just to tolerate retried/overlapping pages
+    processed_ids = set()
+    processed_order = deque(maxlen=256)
+    
+    # Discord sends are queued and drained in order by a single sender task,
+    # so the next poll doesn't wait on Discord round-trips
+    send_queue = asyncio.Queue()
+    
+    # Hoist attribute lookups used on every message out of the hot loop
+    send = discord_channel.send
+    add_title = state.titles.append
+    add_requester = state.requesters.append
+    
+    async def _sender():
+        while True:
+            kwargs = await send_queue.get()
+            if kwargs is None:
+                return
+            try:
+                await send(**kwargs)
+            except Exception as e:
+                print(f"Live chat send error: {e}")
+    
+    def _send_in_background(**kwargs):
+        send_queue.put_nowait(kwargs)
+    
+    async def _fetch(token):
+        params = {
+            "key": YOUTUBE_API_KEY,
+            "liveChatId": live_chat_id,
+            "part": "snippet,authorDetails",
+            "maxResults": 2000,
+            "fields": _CHAT_FIELDS
+        }
+        if token:
+            params["pageToken"] = token
+        return await youtube_get(_YT_CHAT_MESSAGES_URL, params)
+    
+    empty_polls = 0  # Consecutive polls with no new messages, drives the back-off
+    
+    sender_task = asyncio.create_task(_sender())
     
     try:
-        while discord_channel.id in active_streams and active_streams[discord_channel.id] == video_id:
-            response = youtube_client.liveChatMessages().list(
-                liveChatId=live_chat_id,
-                part="snippet,authorDetails",
-                pageToken=next_page_token
-            ).execute()
-
-            for item in response["items"]:
+        while state.video_id == video_id:
+            response = await _fetch(next_page_token)
+            next_page_token = response.get("nextPageToken")
+            items = response.get("items", [])  # The field mask drops "items" on empty pages
+            
+            # Quiet chat: skip processing and back off (40s, 80s, then capped at 120s)
+            if not items:
+                empty_polls += 1
+                await asyncio.sleep(min(120, 20 * 2 ** min(empty_polls, 3)))
+                continue
+            empty_polls = 0
+
+            # Sent together after the page is processed
+            pending_embeds = []
+            pending_lines = []
+            for item in items:
                 message_id = item["id"]
                 
                 # Skip if we've already processed this message
-                if message_id in processed_messages:
+                if message_id in processed_ids:
                     continue
                 
-                # Add to processed messages to avoid duplicates
-                processed_messages.add(message_id)
+                # Add to processed messages, dropping the oldest once the ring is full
+                if len(processed_order) == processed_order.maxlen:
+                    processed_ids.discard(processed_order[0])
+                processed_order.append(message_id)
+                processed_ids.add(message_id)
                 
                 message_text = item["snippet"]["displayMessage"]
                 author = item["authorDetails"]["displayName"]
                 
                 # Only process messages that start with !req
-                if not message_text.lower().startswith('!req'):
+                # Lowercase only the prefix rather than copying the whole message
+                if message_text[:_REQ_PREFIX_LEN].lower() != _REQ_PREFIX:
                     continue
                 
-                # Create an embed for better formatting
-                embed = discord.Embed(
-                    description=message_text,
-                    color=discord.Color.red()
-                )
-                embed.set_author(name=author)
-                embed.set_footer(text="YouTube Live Chat")
-                
                 # Create song list
                 song_list_temp = message_text[5:]
 
                 # Add it to the list
-                current_idx += 1
-                song_list[current_idx] = [song_list_temp,author]
+                add_title(song_list_temp)
+                add_requester(author)
                 
-                await discord_channel.send(embed=embed)
+                if state.use_embeds:
+                    # Create an embed for better formatting
+                    embed = discord.Embed(description=message_text, color=_YT_COLOR)
+                    embed.set_author(name=author)
+                    embed.set_footer(text=_YT_FOOTER)
+                    pending_embeds.append(embed)
+                else:
+                    pending_lines.append(f"**{discord.utils.escape_markdown(author)}** — {discord.utils.escape_markdown(message_text)}")
+
+            # Send in the background so the next poll isn't held up by Discord
+            # round-trips; up to 10 embeds or 2000 characters per message
+            for i in range(0, len(pending_embeds), _MAX_EMBEDS_PER_MESSAGE):
+                _send_in_background(embeds=pending_embeds[i:i + _MAX_EMBEDS_PER_MESSAGE])
+            for content in chunk_lines(pending_lines):
+                _send_in_background(content=content, allowed_mentions=_NO_MENTIONS)
 
-            next_page_token = response.get("nextPageToken")
-            
             # Wait before polling again (YouTube API recommends polling interval)
             poll_interval = response.get("pollingIntervalMillis", 5000) / 1000
             await asyncio.sleep(max(poll_interval, 20))  # Minimum 20 seconds
             
+    except asyncio.CancelledError:
+        pass  # Stopped via !stop_live_chat; still drain sends and report below
     except Exception as e:
+        # The chat may have ended; don't hand out a stale ID on the next start
+        chat_id_cache.pop(video_id, None)
         await discord_channel.send(f"❌ Error while fetching live chat: {e}")
         print(f"Live chat fetch error: {e}")
+    finally:
+        # Clean up when done; always hand the sender its sentinel, even if
+        # we're cancelled again while reporting an error above
+        _release()
+        send_queue.put_nowait(None)
     
-    # Clean up when done
-    if discord_channel.id in active_streams:
-        del active_streams[discord_channel.id]
+    # Let any queued sends finish before reporting the stop
+    await sender_task
     
     await discord_channel.send("🛑 Stopped monitoring live chat.")
 
 @bot.event
 async def on_ready():
-    global youtube_client
     print(f"Bot is ready! Logged in as {bot.user.name}")
-    
-    # Initialize YouTube API client
-    if YOUTUBE_API_KEY:
-        youtube_client = googleapiclient.discovery.build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-        print("YouTube API client initialized")
-    else:
-        print("Warning: YouTube API key not found!")
 
 @bot.command(name='hello')
 async def hello(ctx):
@@ -160,9 +322,7 @@ async def hello(ctx):
 @bot.command(name='start_live_chat')
 async def start_live_chat(ctx, url: str):
     """Start monitoring YouTube live chat and send messages to current Discord channel"""
-    global song_list, current_idx, played_idx  # Fix: Reset queue for new stream
-    
-    if not youtube_client:
+    if not youtube_http:
         await ctx.send("❌ YouTube API is not configured. Please check your API key.")
         return
     
@@ -171,44 +331,59 @@ async def start_live_chat(ctx, url: str):
         await ctx.send("❌ That doesn't look like a valid YouTube URL.")
         return
     
+    state = get_queue(ctx.channel.id)
+    
     # Check if there's already an active stream for this channel
-    if ctx.channel.id in active_streams:
+    if state.video_id:
         await ctx.send(f"❌ Already monitoring a live chat in this channel. Use `!stop_live_chat` first.")
         return
     
     # Reset the queue for new stream
-    # song_list = {}
-    # current_idx = 0
-    # played_idx = 0
+    # state.titles.clear()
+    # state.requesters.clear()
+    # state.played_idx = -1
     
     # Store the active stream
-    active_streams[ctx.channel.id] = video_id
+    state.video_id = video_id
     
     # Start fetching live chat in the background
-    bot.loop.create_task(fetch_live_chat_messages(video_id, ctx.channel))
+    state.fetch_task = bot.loop.create_task(fetch_live_chat_messages(video_id, ctx.channel))
     
     await ctx.send(f"🔄 Starting to monitor live chat for video: `{video_id}`")
 
 @bot.command(name='stop_live_chat')
 async def stop_live_chat(ctx):
     """Stop monitoring YouTube live chat for current Discord channel"""
-    if ctx.channel.id not in active_streams:
+    state = streams.get(ctx.channel.id)
+    if state is None or not state.video_id:
         await ctx.send("❌ No active live chat monitoring in this channel.")
         return
     
-    # Remove from active streams (this will stop the fetch loop)
-    del active_streams[ctx.channel.id]
+    # Cancel the fetch loop right away, even mid back-off sleep, so a quick
+    # restart on the same video can't end up running alongside it
+    if state.fetch_task is not None:
+        state.fetch_task.cancel()
+        state.fetch_task = None
+    state.video_id = ''
     await ctx.send("🛑 Stopped live chat monitoring for this channel.")
 
 @bot.command(name='live_status')
 async def live_status(ctx):
     """Check the status of live chat monitoring"""
-    if ctx.channel.id in active_streams:
-        video_id = active_streams[ctx.channel.id]
-        await ctx.send(f"✅ Currently monitoring live chat for video: `{video_id}`")
+    state = streams.get(ctx.channel.id)
+    if state is not None and state.video_id:
+        await ctx.send(f"✅ Currently monitoring live chat for video: `{state.video_id}`")
     else:
         await ctx.send("❌ No active live chat monitoring in this channel.")
 
+@bot.command(name='req_embed')
+async def req_embed(ctx):
+    """Toggle between embed and plain text relays of !req messages"""
+    state = get_queue(ctx.channel.id)
+    state.use_embeds = not state.use_embeds
+    mode = "embed" if state.use_embeds else "plain text"
+    await ctx.send(f"✅ `!req` messages will now be sent as {mode}.")
+
 @bot.command(name='current_song')
 async def current_song(ctx):
     """Check the current song"""
@@ -216,31 +391,25 @@ async def current_song(ctx):
         title="Lily Current Song",
         color=discord.Color.blue()
     )
+    state = streams.get(ctx.channel.id)
     
     # Fix: Better logic for current song
-    if not song_list:
+    if state is None or not state.titles:
         song_embed.add_field(
             name="Current Song",
             value="Tidak ada lagu dalam queue saat ini!",
             inline=False
         )
-    elif played_idx == 0:
-        if current_idx >= 1:
-            song_embed.add_field(
-                name="Current Song",
-                value=f"Belum ada lagu yang dimainkan. Next: {song_list[1][0]} - {song_list[1][1]}",
-                inline=False
-            )
-        else:
-            song_embed.add_field(
-                name="Current Song",
-                value="Tidak ada lagu dalam queue saat ini!",
-                inline=False
-            )
+    elif state.played_idx < 0:
+        song_embed.add_field(
+            name="Current Song",
+            value=f"Belum ada lagu yang dimainkan. Next: {state.titles[0]} - {state.requesters[0]}",
+            inline=False
+        )
     else:
         song_embed.add_field(
             name="Current Song",
-            value=f"{song_list[played_idx][0]} - {song_list[played_idx][1]}", 
+            value=f"{state.titles[state.played_idx]} - {state.requesters[state.played_idx]}", 
             inline=False
         )
     await ctx.send(embed=song_embed)
@@ -248,46 +417,33 @@ async def current_song(ctx):
 @bot.command(name='next')
 async def next(ctx):
     """Move to the next song"""
-    global played_idx  # Fix: Add global declaration
-    
     next_song = discord.Embed(
         title="Move to the next song",
         color=discord.Color.dark_purple()
     )
+    state = get_queue(ctx.channel.id)
+    titles, requesters = state.titles, state.requesters
     
     # Fix: Simplified and corrected logic
-    if not song_list:
+    if not titles:
         next_song.add_field(
             name="Queue Empty",
             value="Tidak ada lagu dalam queue!",
             inline=False
         )
-    elif played_idx == 0 and current_idx >= 1:
-        # Start playing the first song
-        played_idx = 1
-        next_song.add_field(
-            name="Now Playing",
-            value=f"{song_list[played_idx][0]} - {song_list[played_idx][1]}",
-            inline=False
-        )
-        if current_idx > 1:
-            next_song.add_field(
-                name="Next Song",
-                value=f"{song_list[played_idx + 1][0]} - {song_list[played_idx + 1][1]}",
-                inline=False
-            )
-    elif played_idx < current_idx:
-        # Move to next song
-        played_idx += 1
+    elif state.played_idx < len(titles) - 1:
+        # Move to next song (or start playing the first one)
+        state.played_idx += 1
+        played_idx = state.played_idx
         next_song.add_field(
             name="Now Playing",
-            value=f"{song_list[played_idx][0]} - {song_list[played_idx][1]}",
+            value=f"{titles[played_idx]} - {requesters[played_idx]}",
             inline=False
         )
-        if played_idx < current_idx:
+        if played_idx < len(titles) - 1:
             next_song.add_field(
                 name="Next Song",
-                value=f"{song_list[played_idx + 1][0]} - {song_list[played_idx + 1][1]}",
+                value=f"{titles[played_idx + 1]} - {requesters[played_idx + 1]}",
                 inline=False
             )
         else:
@@ -309,20 +465,20 @@ async def next(ctx):
 @bot.command(name='add')
 async def add(ctx, *, song):
     """Add song from Trakteer"""
-    global current_idx
-    if ctx.channel.id in active_streams:
-        print(song, song.split("-"))
-        song_list_format = "(Trakteer) - " + song.split("-")[0]
-        nama_request = song.split("-")[1]
-        current_idx += 1
-
-        song_list[current_idx] = [song_list_format,nama_request]
-        embed = discord.Embed(
-                    description=song_list_format,
-                    color=discord.Color.red()
-                )
+    state = streams.get(ctx.channel.id)
+    if state is not None and state.video_id:
+        parts = song.split("-", 1)
+        if len(parts) != 2 or not parts[0].strip() or not parts[1].strip():
+            await ctx.send("❌ Format: `!add <lagu>-<requester>`")
+            return
+        song_list_format = f"(Trakteer) - {parts[0].strip()}"
+        nama_request = parts[1].strip()
+
+        state.titles.append(song_list_format)
+        state.requesters.append(nama_request)
+        embed = discord.Embed(description=song_list_format, color=_YT_COLOR)
         embed.set_author(name=nama_request)
-        embed.set_footer(text="Trakteer Request Chat")
+        embed.set_footer(text=_TRAKTEER_FOOTER)
         await ctx.send(embed=embed)
     else:
         await ctx.send("❌ No active live chat monitoring in this channel.")
@@ -336,83 +492,49 @@ async def list_song(ctx):
         color=discord.Color.magenta()
     )
     
+    state = streams.get(ctx.channel.id) or QueueState()
+    titles, requesters, played_idx = state.titles, state.requesters, state.played_idx
+    
     # Check if queue is empty
-    if not song_list:
+    if not titles:
         queue_embed.add_field(
             name="Queue Status",
             value="Tidak ada lagu dalam queue!",
             inline=False
         )
     else:
-        total_songs = len(song_list)
-        
-        # Determine which songs to show based on Discord's 25 field limit
-        if total_songs <= 24:
-            # Show all songs if 24 or fewer
-            songs_to_show = list(range(1, current_idx + 1))
-        else:
-            # Show last 3 played songs + all unplayed songs
-            songs_to_show = []
-            
-            # Get last 3 played songs
-            if played_idx > 0:
-                start_played = max(1, played_idx - 2)  # Last 3 played songs
-                songs_to_show.extend(range(start_played, played_idx + 1))
-            
-            # Add all unplayed songs
-            if played_idx < current_idx:
-                songs_to_show.extend(range(played_idx + 1, current_idx + 1))
-            
-            # Ensure we don't exceed 24 fields (keeping 1 for potential gap indicator)
-            if len(songs_to_show) > 23:
-                # Prioritize current and upcoming songs
-                if played_idx > 0:
-                    # Show current + next songs up to limit or end of queue
-                    max_next_songs = min(22, current_idx - played_idx)
-                    songs_to_show = [played_idx] + list(range(played_idx + 1, played_idx + 1 + max_next_songs))
-                else:
-                    # Show first 23 songs or all if less
-                    max_songs = min(23, current_idx)
-                    songs_to_show = list(range(1, max_songs + 1))
+        # Discord allows 25 fields: show a window of 24 songs starting at the
+        # last 3 played, plus one field for the skipped-songs indicator
+        start = max(0, min(played_idx - 2, len(titles) - 24))
+        end = min(len(titles), start + 24)
         
-        # Add gap indicator if we're not showing all songs
-        show_gap = total_songs > 24 and played_idx > 3
+        if start:
+            queue_embed.add_field(
+                name="...",
+                value=f"⏸️ {start} songs skipped for display",
+                inline=False
+            )
         
-        # Display songs
-        for i, song_id in enumerate(songs_to_show):
-            # Add gap indicator before current song if needed
-            if show_gap and song_id == played_idx and played_idx > 3:
-                queue_embed.add_field(
-                    name="...",
-                    value=f"⏸️ {played_idx - 3} songs skipped for display",
-                    inline=False
-                )
-            
-            if song_id < played_idx:
+        # Display songs (IDs shown to users are 1-based)
+        for i in range(start, end):
+            if i < played_idx:
                 # Songs that have been played
-                queue_embed.add_field(
-                    name=f"#{song_id}",
-                    value=f"✅ {song_list[song_id][0]} - {song_list[song_id][1]}",
-                    inline=False
-                )
-            elif song_id == played_idx:
+                name, state_icon = f"#{i + 1}", "✅"
+            elif i == played_idx:
                 # Currently playing song
-                queue_embed.add_field(
-                    name=f"#{song_id} 🎵",
-                    value=f"▶️ {song_list[song_id][0]} - {song_list[song_id][1]}",
-                    inline=False
-                )
+                name, state_icon = f"#{i + 1} 🎵", "▶️"
             else:
                 # Upcoming songs
-                queue_embed.add_field(
-                    name=f"#{song_id}",
-                    value=f"⏳ {song_list[song_id][0]} - {song_list[song_id][1]}",
-                    inline=False
-                )
+                name, state_icon = f"#{i + 1}", "⏳"
+            queue_embed.add_field(
+                name=name,
+                value=f"{state_icon} {titles[i]} - {requesters[i]}",
+                inline=False
+            )
     
     # Add queue info at the footer
-    if song_list:
-        queue_embed.set_footer(text=f"{played_idx}/{len(song_list)} played | Total: {len(song_list)} songs")
+    if titles:
+        queue_embed.set_footer(text=f"{played_idx + 1}/{len(titles)} played | Total: {len(titles)} songs")
     else:
         queue_embed.set_footer(text="No songs in queue")
     
@@ -421,67 +543,32 @@ async def list_song(ctx):
 @bot.command(name='delete')
 async def delete_song(ctx, song_id: int):
     """Delete a song from the queue by its ID"""
-    global current_idx, played_idx
+    state = get_queue(ctx.channel.id)
+    titles, requesters = state.titles, state.requesters
     
     # Check if queue is empty
-    if not song_list:
+    if not titles:
         await ctx.send("❌ Queue is empty! No songs to delete.")
         return
     
     # Check if song_id is valid
-    if song_id < 1 or song_id > current_idx:
-        await ctx.send(f"❌ Invalid song ID! Please use a number between 1 and {current_idx}")
+    if song_id < 1 or song_id > len(titles):
+        await ctx.send(f"❌ Invalid song ID! Please use a number between 1 and {len(titles)}")
         return
     
-    # Check if song exists in the dictionary
-    if song_id not in song_list:
-        await ctx.send(f"❌ Song #{song_id} not found in queue!")
-        return
+    idx = song_id - 1
     
     # Check if trying to delete currently playing song
-    if song_id == played_idx:
+    if idx == state.played_idx:
         await ctx.send("❌ Cannot delete the currently playing song! Use `!next` to skip it.")
         return
     
-    # Store song info for confirmation message
-    deleted_song = song_list[song_id]
-    
-    # Delete the song
-    del song_list[song_id]
+    # Delete the song; later songs shift down so IDs stay consecutive
+    deleted_song = (titles.pop(idx), requesters.pop(idx))
     
     # Adjust played_idx if we deleted a song before the current one
-    if song_id < played_idx:
-        played_idx -= 1
-    
-    # Rebuild the song_list with consecutive IDs
-    if song_list:
-        # Create a new dictionary with consecutive IDs
-        old_song_list = song_list.copy()
-        song_list.clear()
-        
-        new_id = 1
-        old_played_id = played_idx
-        new_played_id = 0
-        
-        for old_id in range(1, current_idx + 1):
-            if old_id in old_song_list:
-                song_list[new_id] = old_song_list[old_id]
-                
-                # Update played_idx to match the new numbering
-                if old_id == old_played_id:
-                    new_played_id = new_id
-                elif old_id < old_played_id and new_played_id == 0:
-                    new_played_id = new_id
-                
-                new_id += 1
-        
-        # Update global variables
-        current_idx = len(song_list)
-        played_idx = new_played_id
-    else:
-        # Queue is now empty
-        current_idx = 0
-        played_idx = 0
+    if idx < state.played_idx:
+        state.played_idx -= 1
     
     # Send confirmation message
     embed = discord.Embed(
@@ -495,15 +582,15 @@ async def delete_song(ctx, song_id: int):
     )
     embed.add_field(
         name="Queue Status",
-        value=f"Remaining songs: {len(song_list)}",
+        value=f"Remaining songs: {len(titles)}",
         inline=False
     )
     
     await ctx.send(embed=embed)
 
 
-@bot.command(name="help_live")
-async def help_live(ctx):
+def _build_help_embed() -> discord.Embed:
+    """Build the static help_live documentation embed"""
     embed = discord.Embed(
         title="🎶 Lily-bot Documentation",
         description="Panduan lengkap penggunaan Lily-bot selama livestream #Lypsing!",
@@ -545,6 +632,7 @@ async def help_live(ctx):
             "- !start_live_chat <link>   = Memulai bot\n"
             "- !end_live_chat            = Mematikan bot\n"
             "- !ganti <lagu>-<req>       = (in progress) Ganti request\n"
+            "- !req_embed                = Ganti tampilan !req (embed/teks biasa)\n"
             "- !help_live                = Dokumentasi lainnya\n"
             "```"
         ),
@@ -559,19 +647,36 @@ async def help_live(ctx):
 
     embed.set_footer(text="Lily-bot | Powered by #Lypsing")
 
-    await ctx.send(embed=embed)
+    return embed
+
+# Content is static and never mutated, so build it once and reuse it
+_HELP_EMBED = _build_help_embed()
+
+@bot.command(name="help_live")
+async def help_live(ctx):
+    await ctx.send(embed=_HELP_EMBED)
 
 
 # Error handling
+# Error type -> handler; a handler returns a coroutine to await, or None
+_ERR_HANDLERS = {
+    commands.MissingRequiredArgument: lambda ctx, error: ctx.send("❌ Missing required argument. Use `!help_live` for command usage."),
+    commands.CommandNotFound: lambda ctx, error: None,  # Ignore unknown commands
+}
+
 @bot.event
 async def on_command_error(ctx, error):
-    if isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send("❌ Missing required argument. Use `!help_live` for command usage.")
-    elif isinstance(error, commands.CommandNotFound):
-        pass  # Ignore unknown commands
-    else:
-        print(f"Command error: {error}")
-        await ctx.send(f"❌ An error occurred: {error}")
+    # Walk the MRO so subclasses (e.g. MissingRequiredAttachment) use their base's handler
+    for error_type in type(error).__mro__:
+        err_handler = _ERR_HANDLERS.get(error_type)
+        if err_handler is not None:
+            coro = err_handler(ctx, error)
+            if coro is not None:
+                await coro
+            return
+    
+    print(f"Command error: {error}")
+    await ctx.send(f"❌ An error occurred: {error}")
 
 # Run the bot
 if __name__ == "__main__":
@@ -581,4 +686,4 @@ if __name__ == "__main__":
         print("Error: YOUTUBE_API_KEY not found in environment variables")
     else:
         webserver.keep_alive()
-        bot.run(DISCORD_TOKEN, log_handler=handler, log_level=logging.DEBUG)
\ No newline at end of file
+        bot.run(DISCORD_TOKEN, log_handler=handler, log_level=logging.INFO)
\ No newline at end of file